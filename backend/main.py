@@ -1,16 +1,20 @@
 import os
 import json
+import asyncio
+import sys
+import hmac
+import orjson
 import logging
 import traceback
-import requests
+import time
+import httpx
+from hashlib import blake2b
+from cachetools import TTLCache
 from fastapi import FastAPI, HTTPException, Request, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse, JSONResponse
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 from dotenv import load_dotenv
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
 
 # Setup basic logging (fallback if structlog fails)
 logging.basicConfig(level=logging.INFO)
@@ -41,20 +45,72 @@ load_dotenv()
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 API_KEY = os.getenv("API_KEY")
 ENVIRONMENT = os.getenv("ENVIRONMENT", "development")
-ALLOWED_ORIGINS = os.getenv("ALLOWED_ORIGINS", "http://localhost:3000").split(",")
+REDIS_URL = os.getenv("REDIS_URL")
+ALLOWED_ORIGINS = tuple(
+    origin.strip()
+    for origin in os.getenv("ALLOWED_ORIGINS", "http://localhost:3000").split(",")
+    if origin.strip()
+)
 
-# Add this debugging block
-print("=== ENVIRONMENT DEBUG ===")
-print(f"ENVIRONMENT: '{ENVIRONMENT}'")
-print(f"ENVIRONMENT == 'development': {ENVIRONMENT == 'development'}")
-print(f"API_KEY: {API_KEY}")
-print(f"ALLOWED_ORIGINS: {ALLOWED_ORIGINS}")
-print("========================")
+if logger.isEnabledFor(logging.DEBUG):
+    logger.debug("env_config",
+                 environment=ENVIRONMENT,
+                 api_key_set=bool(API_KEY),
+                 allowed_origins=ALLOWED_ORIGINS)
 
 if not GROQ_API_KEY:
     raise ValueError("GROQ_API_KEY environment variable is required")
 if not API_KEY and ENVIRONMENT == "production":
     raise ValueError("API_KEY environment variable is required for production")
+if not ALLOWED_ORIGINS:
+    raise ValueError("ALLOWED_ORIGINS must contain at least one origin")
+
+# Static parts of the generation prompt, built once at import time; only the
+# user's idea is spliced in per request
+PROMPT_PREFIX = """You are a senior software engineer creating a professional GitHub repository. Respond with ONLY valid JSON - no explanations, no markdown, no other text.
+
+Generate a complete GitHub repository for: \""""
+PROMPT_SUFFIX = """"
+
+Requirements:
+- Repository name: under 20 characters, kebab-case, creative
+- Description: under 100 characters
+- README: comprehensive but concise, use \\n for line breaks
+
+Respond with this EXACT JSON structure:
+{
+  "repository_name": "short-kebab-name",
+  "description": "Brief professional description",
+  "readme_content": "# Project Title 🚀\\n\\nBrief description of what this project does and why it's useful.\\n\\n## ✨ Features\\n\\n- Feature 1\\n- Feature 2\\n- Feature 3\\n\\n## 🛠️ Tech Stack\\n\\n- Frontend: React.js\\n- Backend: Node.js\\n- Database: MongoDB\\n\\n## 🚀 Quick Start\\n\\n```bash\\ngit clone https://github.com/username/repo-name.git\\ncd repo-name\\nnpm install\\nnpm start\\n```\\n\\n## 📝 Usage\\n\\n```javascript\\n// Example usage\\nconsole.log('Hello World!');\\n```\\n\\n## 🤝 Contributing\\n\\nContributions are welcome! Please feel free to submit a Pull Request.\\n\\n## 📄 License\\n\\nMIT License - see LICENSE file for details."
+}
+
+RESPOND ONLY WITH VALID JSON. NO OTHER TEXT."""
+
+GROQ_API_URL = "https://api.groq.com/openai/v1/chat/completions"
+GROQ_HEADERS = {
+    "Authorization": f"Bearer {GROQ_API_KEY}",
+    "Content-Type": "application/json"
+}
+
+# Caps in-flight Groq calls; size to the account's rate-limit tier
+GROQ_CONCURRENCY = int(os.getenv("GROQ_CONCURRENCY", "4"))
+GROQ_SEMAPHORE = asyncio.Semaphore(GROQ_CONCURRENCY)
+
+# Pre-encoded SSE frames; StreamingResponse writes bytes without re-encoding
+SSE_GENERATING = 'data: {"status": "generating", "message": "🤖 Generating repository..."}\n\n'.encode()
+SSE_CACHED = 'data: {"status": "cached", "message": "⚡ Loading cached repository..."}\n\n'.encode()
+SSE_DONE_PREFIX = b"event: done\ndata: "
+SSE_FRAME_END = b"\n\n"
+
+# Fixed error payloads; details go to the logs, never on the wire
+SSE_ERROR_BAD_RESPONSE = b'event: error\ndata: {"error": "AI service returned an unexpected response", "code": "API_ERROR"}\n\n'
+SSE_ERROR_TIMEOUT = b'event: error\ndata: {"error": "Request timeout - please try again", "code": "TIMEOUT"}\n\n'
+SSE_ERROR_API = b'event: error\ndata: {"error": "AI service temporarily unavailable", "code": "API_ERROR"}\n\n'
+SSE_ERROR_INTERNAL = b'event: error\ndata: {"error": "Internal server error", "code": "INTERNAL_ERROR"}\n\n'
+
+# Parsed generations keyed by prompt hash; output is near-deterministic at
+# temperature 0.1 so repeat prompts can skip the Groq round-trip
+generation_cache = TTLCache(maxsize=1024, ttl=3600)
 
 app = FastAPI(
     title="AI Repo Generator",
@@ -76,10 +132,20 @@ try:
     from slowapi.util import get_remote_address
     from slowapi.errors import RateLimitExceeded
     
-    limiter = Limiter(key_func=get_remote_address)
+    # Share counters through Redis when configured so limits hold across workers
+    limiter = Limiter(
+        key_func=get_remote_address,
+        storage_uri=REDIS_URL or "memory://",
+        strategy="moving-window"
+    )
     app.state.limiter = limiter
     app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
     RATE_LIMITING_ENABLED = True
+    if REDIS_URL:
+        logger.info("rate_limiter_configured", storage="redis")
+    else:
+        # In-memory counters are per process, so each uvicorn worker has its own limit
+        logger.warning("rate_limiter_configured", storage="memory")
 except ImportError:
     logger.warning("slowapi not available, rate limiting disabled")
     RATE_LIMITING_ENABLED = False
@@ -108,28 +174,25 @@ class RepoRequest(BaseModel):
         description="Project description (5-500 characters)"
     )
 
+    @field_validator("prompt", mode="before")
+    @classmethod
+    def strip_prompt(cls, value):
+        # Strip before the length limits apply so padding can't satisfy them
+        return value.strip() if isinstance(value, str) else value
+
 # API Key authentication middleware
+SKIP_AUTH_PATHS = frozenset({"/"})
 
 
-@app.middleware("http")
 async def validate_api_key(request: Request, call_next):
-    print(f"=== MIDDLEWARE DEBUG ===")
-    print(f"Method: {request.method}")
-    print(f"Path: {request.url.path}")
-    print(f"Environment: '{ENVIRONMENT}'")
-    print(f"Should skip: {request.url.path == '/' or request.method == 'OPTIONS' or ENVIRONMENT == 'development'}")
-    print("========================")
-    
-    # Skip auth for root endpoint, OPTIONS requests, and in development
-    if (request.url.path == "/" or 
-        request.method == "OPTIONS" or
-        ENVIRONMENT == "development"):
+    # Skip auth for root endpoint and OPTIONS requests
+    if request.url.path in SKIP_AUTH_PATHS or request.method == "OPTIONS":
         response = await call_next(request)
         return response
     
     # Check API key for all other endpoints
     api_key = request.headers.get("X-API-Key")
-    if not api_key or api_key != API_KEY:
+    if not api_key or not API_KEY or not hmac.compare_digest(api_key.encode(), API_KEY.encode()):
         logger.warning("unauthorized_access_attempt", 
                       client_ip=get_remote_address(request), 
                       path=request.url.path,
@@ -142,11 +205,20 @@ async def validate_api_key(request: Request, call_next):
     response = await call_next(request)
     return response
 
+# Auth is skipped entirely in development, so only register it elsewhere
+if ENVIRONMENT != "development":
+    app.middleware("http")(validate_api_key)
 
 
 
+
+# Responses that needed the lenient JSON parser; if this keeps climbing the
+# prompt needs tuning
+lenient_json_parses = 0
+
 def extract_json_from_response(text):
     """Extract JSON from model response, handling various formats"""
+    global lenient_json_parses
     text = text.strip()
     
     # Remove markdown code blocks if present
@@ -155,39 +227,39 @@ def extract_json_from_response(text):
     elif text.startswith('```'):
         text = text.replace('```', '')
     
-    # Try to find JSON block - more robust regex
-    import re
-    json_match = re.search(r'\{.*\}', text, re.DOTALL | re.MULTILINE)
-    if json_match:
-        json_str = json_match.group().strip()
+    # Slice from the first '{' to the last '}' to find the JSON block
+    start = text.find('{')
+    end = text.rfind('}')
+    if start != -1 and end > start:
+        json_str = text[start:end + 1]
         try:
-            return json.loads(json_str)
-        except json.JSONDecodeError as e:
-            logger.warning(f"JSON decode error: {e}, trying to fix common issues")
-            # Try to fix common JSON issues
-            json_str = json_str.replace('\n', '\\n').replace('\t', '\\t')
+            return orjson.loads(json_str)
+        except orjson.JSONDecodeError as e:
+            # Models often emit raw newlines/tabs inside strings; the stdlib
+            # parser accepts those control characters with strict=False
+            lenient_json_parses += 1
+            logger.warning("json_decode_error_lenient_retry",
+                           error=str(e),
+                           lenient_json_parses=lenient_json_parses)
             try:
-                return json.loads(json_str)
+                return json.loads(json_str, strict=False)
             except json.JSONDecodeError:
                 pass
     
     # Try direct parsing
     try:
-        return json.loads(text)
-    except json.JSONDecodeError:
+        return orjson.loads(text)
+    except orjson.JSONDecodeError:
         pass
     
     return None
 
-def query_groq_complete(prompt, model="llama-3.1-8b-instant", temperature=0.1, max_tokens=8000):
+def sse_done(data):
+    """Encode a result dict as a `done` SSE frame"""
+    return SSE_DONE_PREFIX + orjson.dumps(data) + SSE_FRAME_END
+
+async def query_groq_complete(prompt, model="llama-3.1-8b-instant", temperature=0.1, max_tokens=8000):
     """Query Groq API without streaming for better JSON handling"""
-    url = "https://api.groq.com/openai/v1/chat/completions"
-    
-    headers = {
-        "Authorization": f"Bearer {GROQ_API_KEY}",
-        "Content-Type": "application/json"
-    }
-    
     payload = {
         "model": model,
         "messages": [
@@ -198,50 +270,11 @@ def query_groq_complete(prompt, model="llama-3.1-8b-instant", temperature=0.1, m
         "stream": False  # Disable streaming for cleaner JSON
     }
     
-    response = requests.post(url, headers=headers, json=payload, timeout=30)
-    response.raise_for_status()
-    
-    return response.json()
-
-def query_groq_stream(prompt, model="llama-3.1-8b-instant", temperature=0.1, max_tokens=8000):
-    """Query Groq API with streaming - collect full response then parse"""
-    url = "https://api.groq.com/openai/v1/chat/completions"
-    
-    headers = {
-        "Authorization": f"Bearer {GROQ_API_KEY}",
-        "Content-Type": "application/json"
-    }
-    
-    payload = {
-        "model": model,
-        "messages": [
-            {"role": "user", "content": prompt}
-        ],
-        "temperature": temperature,
-        "max_tokens": max_tokens,
-        "stream": True
-    }
-    
-    response = requests.post(url, headers=headers, json=payload, stream=True, timeout=30)
+    async with GROQ_SEMAPHORE:
+        response = await app.state.http_client.post(GROQ_API_URL, headers=GROQ_HEADERS, json=payload)
     response.raise_for_status()
     
-    full_content = ""
-    for line in response.iter_lines():
-        if line:
-            line = line.decode('utf-8')
-            if line.startswith('data: '):
-                if line.strip() == 'data: [DONE]':
-                    break
-                try:
-                    data = json.loads(line[6:])  # Remove 'data: ' prefix
-                    if 'choices' in data and len(data['choices']) > 0:
-                        delta = data['choices'][0].get('delta', {})
-                        if 'content' in delta:
-                            full_content += delta['content']
-                except json.JSONDecodeError:
-                    continue
-    
-    return full_content
+    return orjson.loads(response.content)
 
 @app.get("/")
 async def root():
@@ -255,46 +288,36 @@ async def root():
 @app.post("/generate_repo/")
 @limiter.limit("5/minute")  # Rate limiting
 async def generate_repo(request: Request, data: RepoRequest):
-    user_prompt = data.prompt.strip()
+    user_prompt = data.prompt
     client_ip = get_remote_address(request)
 
     logger.info("repo_generation_started", 
                 prompt_length=len(user_prompt),
                 client_ip=client_ip)
 
-    # Improved prompt with better JSON formatting instructions
-    system_prompt = f"""You are a senior software engineer creating a professional GitHub repository. Respond with ONLY valid JSON - no explanations, no markdown, no other text.
-
-Generate a complete GitHub repository for: "{user_prompt}"
-
-Requirements:
-- Repository name: under 20 characters, kebab-case, creative
-- Description: under 100 characters
-- README: comprehensive but concise, use \\n for line breaks
-
-Respond with this EXACT JSON structure:
-{{
-  "repository_name": "short-kebab-name",
-  "description": "Brief professional description",
-  "readme_content": "# Project Title 🚀\\n\\nBrief description of what this project does and why it's useful.\\n\\n## ✨ Features\\n\\n- Feature 1\\n- Feature 2\\n- Feature 3\\n\\n## 🛠️ Tech Stack\\n\\n- Frontend: React.js\\n- Backend: Node.js\\n- Database: MongoDB\\n\\n## 🚀 Quick Start\\n\\n```bash\\ngit clone https://github.com/username/repo-name.git\\ncd repo-name\\nnpm install\\nnpm start\\n```\\n\\n## 📝 Usage\\n\\n```javascript\\n// Example usage\\nconsole.log('Hello World!');\\n```\\n\\n## 🤝 Contributing\\n\\nContributions are welcome! Please feel free to submit a Pull Request.\\n\\n## 📄 License\\n\\nMIT License - see LICENSE file for details."
-}}
-
-RESPOND ONLY WITH VALID JSON. NO OTHER TEXT."""
+    system_prompt = PROMPT_PREFIX + user_prompt + PROMPT_SUFFIX
+    cache_key = blake2b(user_prompt.encode(), digest_size=16).digest()
 
-    def event_stream():
+    async def event_stream():
         try:
+            cached_data = generation_cache.get(cache_key)
+            if cached_data is not None:
+                logger.info("repo_generation_cache_hit", client_ip=client_ip)
+                yield SSE_CACHED
+                yield sse_done(cached_data)
+                return
+            
             # Send progress update
-            yield f"data: {{\"status\": \"generating\", \"message\": \"🤖 Generating repository...\"}}\n\n"
+            yield SSE_GENERATING
             
             # Use non-streaming for better JSON reliability
+            response = await query_groq_complete(system_prompt, temperature=0.1, max_tokens=8000)
             try:
-                response = query_groq_complete(system_prompt, temperature=0.1, max_tokens=8000)
                 full_response = response['choices'][0]['message']['content']
-            except:
-                # Fallback to streaming if complete fails
-                logger.info("Falling back to streaming API")
-                yield f"data: {{\"status\": \"generating\", \"message\": \"📝 Processing response...\"}}\n\n"
-                full_response = query_groq_stream(system_prompt, temperature=0.1, max_tokens=8000)
+            except (KeyError, IndexError) as e:
+                logger.error("groq_response_malformed", error=str(e), client_ip=client_ip)
+                yield SSE_ERROR_BAD_RESPONSE
+                return
             
             logger.info("repo_generation_completed", 
                        response_length=len(full_response),
@@ -315,8 +338,9 @@ RESPOND ONLY WITH VALID JSON. NO OTHER TEXT."""
                     "description": str(parsed_json.get("description", "")).strip()[:200],
                     "readme_content": str(parsed_json.get("readme_content", "")).strip()
                 }
+                generation_cache[cache_key] = clean_data
                 
-                yield f"event: done\ndata: {json.dumps(clean_data, ensure_ascii=False)}\n\n"
+                yield sse_done(clean_data)
             else:
                 logger.error("json_parsing_failed", 
                            response_preview=full_response[:500],
@@ -330,34 +354,36 @@ RESPOND ONLY WITH VALID JSON. NO OTHER TEXT."""
                     "raw_response": full_response[:500],
                     "note": "Fallback response due to JSON parsing issues"
                 }
-                yield f"event: done\ndata: {json.dumps(fallback_response)}\n\n"
+                yield sse_done(fallback_response)
 
-        except requests.exceptions.Timeout:
+        except httpx.TimeoutException:
             logger.error("groq_api_timeout", client_ip=client_ip)
-            yield f'event: error\ndata: {{"error": "Request timeout - please try again", "code": "TIMEOUT"}}\n\n'
-        except requests.exceptions.RequestException as req_error:
+            yield SSE_ERROR_TIMEOUT
+        except httpx.HTTPError as req_error:
             logger.error("groq_api_error", error=str(req_error), client_ip=client_ip)
-            yield f'event: error\ndata: {{"error": "AI service temporarily unavailable", "code": "API_ERROR"}}\n\n'
+            yield SSE_ERROR_API
         except Exception as e:
             logger.error("unexpected_error", 
                         error=str(e),
                         traceback=traceback.format_exc(),
                         client_ip=client_ip)
-            yield f'event: error\ndata: {{"error": "Internal server error", "code": "INTERNAL_ERROR"}}\n\n'
+            yield SSE_ERROR_INTERNAL
 
     return StreamingResponse(event_stream(), media_type="text/event-stream")
 
-@app.get("/health/")
-async def health_check():
-    """Comprehensive health check endpoint"""
+# Last Groq probe result as (monotonic timestamp, status); reused for
+# HEALTH_CACHE_TTL seconds so frequent liveness probes don't hit Groq each time
+HEALTH_CACHE_TTL = 30
+_health_cache = (float("-inf"), "unknown (probe in progress)")
+_health_refresh = None  # in-flight refresh task, if any
+
+async def probe_groq():
+    """Send a minimal completion to Groq and describe the outcome"""
     try:
         # Test Groq API connectivity
-        test_response = requests.post(
-            "https://api.groq.com/openai/v1/chat/completions",
-            headers={
-                "Authorization": f"Bearer {GROQ_API_KEY}",
-                "Content-Type": "application/json"
-            },
+        test_response = await app.state.http_client.post(
+            GROQ_API_URL,
+            headers=GROQ_HEADERS,
             json={
                 "model": "llama-3.1-8b-instant",
                 "messages": [{"role": "user", "content": "hi"}],
@@ -371,6 +397,23 @@ async def health_check():
     except Exception as e:
         groq_status = f"unhealthy ({str(e)[:50]})"
         logger.error("groq_health_check_failed", error=str(e))
+    return groq_status
+
+async def refresh_groq_health():
+    """Probe Groq and store the result in the health cache"""
+    global _health_cache
+    _health_cache = (time.monotonic(), await probe_groq())
+
+@app.get("/health/")
+async def health_check():
+    """Comprehensive health check endpoint"""
+    global _health_refresh
+    checked_at, groq_status = _health_cache
+    if time.monotonic() - checked_at >= HEALTH_CACHE_TTL:
+        # Refresh in the background so no caller waits on Groq; everyone gets
+        # the last known status until the single in-flight probe finishes
+        if _health_refresh is None or _health_refresh.done():
+            _health_refresh = asyncio.create_task(refresh_groq_health())
     
     return {
         "status": "healthy",
@@ -379,12 +422,30 @@ async def health_check():
         "groq_key_set": bool(GROQ_API_KEY)
     }
 
+# Shared async HTTP client so the keep-alive pool to Groq is reused across requests
+@app.on_event("startup")
+async def startup_event():
+    app.state.http_client = httpx.AsyncClient(
+        timeout=30,
+        http2=True,
+        limits=httpx.Limits(max_keepalive_connections=32)
+    )
+
 # Graceful shutdown handler
 @app.on_event("shutdown")
 async def shutdown_event():
+    await app.state.http_client.aclose()
     logger.info("application_shutting_down")
 
 if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("PORT", 8000))
-    uvicorn.run("main:app", host="0.0.0.0", port=port, reload=(ENVIRONMENT == "development"))
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=port,
+        # uvloop has no Windows build; fail loudly elsewhere if it's missing
+        loop="asyncio" if sys.platform == "win32" else "uvloop",
+        http="httptools",
+        reload=(ENVIRONMENT == "development")
+    )
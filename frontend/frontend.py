@@ -1,7 +1,8 @@
 import streamlit as st
-import requests
-import json
+import httpx
+import orjson
 import time
+from pathlib import Path
 from typing import Dict, Any
 
 # Page config
@@ -12,244 +13,65 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
-# Ultra-modern CSS styling
-st.markdown("""
-<style>
-    /* Import modern fonts */
-    @import url('https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700;800&family=JetBrains+Mono:wght@400;500;600&display=swap');
-    
-    /* Root variables */
-    :root {
-        --primary: #6366f1;
-        --primary-dark: #4f46e5;
-        --secondary: #8b5cf6;
-        --accent: #06b6d4;
-        --bg-primary: #0f0f23;
-        --bg-secondary: #1a1a2e;
-        --bg-tertiary: #16213e;
-        --text-primary: #ffffff;
-        --text-secondary: #a1a1aa;
-        --border: #27272a;
-        --success: #10b981;
-        --error: #ef4444;
-        --warning: #f59e0b;
-    }
-    
-    /* Main app background */
-    .stApp {
-        background: var(--bg-primary);
-        background-image: 
-            radial-gradient(circle at 25% 25%, rgba(99, 102, 241, 0.1) 0%, transparent 50%),
-            radial-gradient(circle at 75% 75%, rgba(139, 92, 246, 0.1) 0%, transparent 50%);
-    }
-    
-    .main .block-container {
-        padding: 2rem 1rem;
-        max-width: 1400px;
-    }
-    
-    /* Hide Streamlit branding */
-    #MainMenu {visibility: hidden;}
-    footer {visibility: hidden;}
-    header {visibility: hidden;}
-    
-    /* Typography */
-    h1, h2, h3 {
-        color: var(--text-primary) !important;
-    }
-    
-    /* Text area styling */
-    /* Fixed text area styling */
-    .stTextArea textarea {
-        background: var(--bg-tertiary) !important;
-        border: 2px solid var(--border) !important;
-        border-radius: 16px !important;
-        color: var(--text-primary) !important;
-        font-size: 16px !important;
-        padding: 1.5rem !important;
-        font-family: 'Inter', sans-serif !important;
-        line-height: 1.6 !important;
-        cursor: text !important;  /* Ensure cursor is text */
-        user-select: text !important;  /* Ensure text selection works */
-    }
-
+# Ultra-modern CSS styling, read from disk once per server process
+@st.cache_resource
+def load_css() -> str:
+    css = (Path(__file__).parent / "styles.css").read_text(encoding="utf-8")
+    return f"<style>\n{css}</style>"
 
-    .stContainer > div {
-        background: var(--bg-secondary);
-        border: 1px solid var(--border);
-        border-radius: 20px;
-        padding: 2rem;
-        margin-bottom: 2rem;
-    }
-    /* Only transition border color on focus */
-    .stTextArea textarea:focus {
-        border-color: var(--primary) !important;
-        box-shadow: 0 0 0 4px rgba(99, 102, 241, 0.1) !important;
-        outline: none !important;
-    }
-
-    
-    
-    /* Button styling */
-    .stButton > button {
-        background: linear-gradient(135deg, var(--primary) 0%, var(--secondary) 100%) !important;
-        border: none !important;
-        border-radius: 16px !important;
-        padding: 1rem 2rem !important;
-        font-weight: 600 !important;
-        font-size: 16px !important;
-        color: white !important;
-        transition: all 0.3s ease !important;
-        box-shadow: 0 4px 20px rgba(99, 102, 241, 0.3) !important;
-        min-height: 56px !important;
-    }
-    
-    .stButton > button:hover {
-        transform: translateY(-2px) !important;
-        box-shadow: 0 8px 30px rgba(99, 102, 241, 0.4) !important;
-    }
-    
-    /* Download button styling */
-    .stDownloadButton > button {
-        background: var(--bg-tertiary) !important;
-        border: 2px solid var(--border) !important;
-        color: var(--text-primary) !important;
-        border-radius: 12px !important;
-        padding: 1rem 1.5rem !important;
-        font-weight: 600 !important;
-        transition: all 0.3s ease !important;
-        min-height: 56px !important;
-    }
-    
-        .stDownloadButton > button:hover {
-        border-color: var(--primary) !important;
-        background: var(--primary) !important;
-        transform: translateY(-2px) !important;
-        box-shadow: 0 4px 20px rgba(99, 102, 241, 0.3) !important;
-    }
-    
-    /* Alert styling */
-    .stAlert > div {
-        border-radius: 12px !important;
-        padding: 1rem !important;
-    }
-    
-    /* Expander styling */
-    .streamlit-expanderHeader {
-        background: var(--bg-tertiary) !important;
-        border-radius: 12px !important;
-        color: var(--text-primary) !important;
-    }
-    
-    /* Code block styling */
-    pre {
-        background: #0d1117 !important;
-        border: 1px solid #21262d !important;
-        border-radius: 12px !important;
-        padding: 1rem !important;
-    }
-    
-    /* Custom containers */
-    .app-header {
-        text-align: center;
-        padding: 3rem 0;
-        margin-bottom: 2rem;
-    }
-    
-    .app-title {
-        font-size: 3.5rem;
-        font-weight: 800;
-        background: linear-gradient(135deg, #6366f1 0%, #8b5cf6 50%, #06b6d4 100%);
-        -webkit-background-clip: text;
-        -webkit-text-fill-color: transparent;
-        background-clip: text;
-        margin-bottom: 0.5rem;
-    }
-    
-    .app-subtitle {
-        font-size: 1.25rem;
-        color: var(--text-secondary);
-        font-weight: 400;
-    }
-    
-    .input-section {
-        background: var(--bg-secondary);
-        border: 1px solid var(--border);
-        border-radius: 20px;
-        padding: 2rem;
-        margin-bottom: 2rem;
-    }
-    
-    .repo-card {
-        background: var(--bg-tertiary);
-        border: 1px solid var(--border);
-        border-radius: 16px;
-        padding: 2rem;
-        margin: 1.5rem 0;
-    }
-    
-    .repo-name {
-        font-size: 1.75rem;
-        font-weight: 700;
-        color: var(--text-primary);
-        margin-bottom: 0.75rem;
-    }
-    
-    .repo-desc {
-        color: var(--text-secondary);
-        font-size: 1.1rem;
-        line-height: 1.6;
-    }
-    
-    .readme-container {
-        background: #0d1117;
-        border: 1px solid #21262d;
-        border-radius: 16px;
-        padding: 2rem;
-        margin: 1rem 0;
-        color: #e6edf3;
-        max-height: 600px;
-        overflow-y: auto;
-    }
-</style>
-""", unsafe_allow_html=True)
+# Streamlit drops elements a rerun doesn't emit, so the style tag is sent every run
+st.markdown(load_css(), unsafe_allow_html=True)
 
 # Configuration
 BACKEND_URL = "http://localhost:8000"
 
 def stream_response(prompt: str) -> Dict[str, Any]:
     """Stream response from backend"""
+    status = None
+    result = None
     try:
-        response = requests.post(
+        with httpx.stream(
+            "POST",
             f"{BACKEND_URL}/generate_repo/",
             json={"prompt": prompt},
-            stream=True,
             timeout=60
-        )
-        response.raise_for_status()
-        
-        # Process the stream
-        for line in response.iter_lines():
-            if line:
-                line_str = line.decode('utf-8')
-                if line_str.startswith('data: '):
-                    try:
-                        data = json.loads(line_str[6:])  # Remove 'data: '
-                        if 'status' in data:
-                            st.info(f"🤖 {data['message']}")
-                        elif 'repository_name' in data:
-                            return data
-                    except json.JSONDecodeError:
-                        continue
-                        
-        return None
+        ) as response:
+            response.raise_for_status()
+            
+            # Process the stream
+            for line in response.iter_lines():
+                if not line.startswith('data: '):
+                    continue
+                try:
+                    data = orjson.loads(line[6:])  # Remove 'data: '
+                except orjson.JSONDecodeError:
+                    continue
+                
+                if 'status' in data:
+                    # Reuse one status container instead of stacking a new box per frame
+                    label = f"🤖 {data['message']}"
+                    if status is None:
+                        status = st.status(label)
+                    else:
+                        status.update(label=label)
+                elif 'repository_name' in data:
+                    result = data
+                    break
+                elif 'error' in data:
+                    st.error(f"❌ {data['error']}")
+                    break
+            else:
+                st.error("❌ The server closed the connection without a result")
         
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         st.error(f"❌ Connection error: {str(e)}")
-        return None
     except Exception as e:
         st.error(f"❌ Unexpected error: {str(e)}")
-        return None
+    
+    # Settle the status container so it never keeps spinning next to an error
+    if status is not None:
+        status.update(state="complete" if result else "error")
+    return result
 
 def main():
     # Header
@@ -372,7 +194,7 @@ def main():
             with col2:
                 st.download_button(
                     label="📋 Repository JSON",
-                    data=json.dumps(result, indent=2),
+                    data=orjson.dumps(result, option=orjson.OPT_INDENT_2),
                     file_name=f"{result['repository_name']}.json",
                     mime="application/json",
                     use_container_width=True
@@ -396,7 +218,7 @@ def main():
                     }
                     st.download_button(
                         label="📦 package.json",
-                        data=json.dumps(package_json, indent=2),
+                        data=orjson.dumps(package_json, option=orjson.OPT_INDENT_2),
                         file_name="package.json",
                         mime="application/json",
                         use_container_width=True